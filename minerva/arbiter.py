@@ -1,3 +1,5 @@
+from bisect import insort
+
 from amaranth import *
 from amaranth.lib import wiring
 from amaranth.lib.wiring import In, Out
@@ -8,12 +10,31 @@ from amaranth_soc import wishbone
 __all__ = ["WishboneArbiter"]
 
 
+_bus_signature = wishbone.Signature(addr_width=30, data_width=32, granularity=8,
+                                    features=("err", "cti", "bte"))
+
+# Bus signals driven by the granted initiator, and bus signals returned to it.
+_FANOUT_FIELDS = tuple(name for name, member in _bus_signature.members.items()
+                       if member.flow == Out)
+_FANIN_FIELDS  = tuple(name for name, member in _bus_signature.members.items()
+                       if member.flow == In)
+
+
+def _tree_or(terms):
+    if len(terms) == 0:
+        return 0
+    if len(terms) == 1:
+        return terms[0]
+    mid = len(terms) // 2
+    return _tree_or(terms[:mid]) | _tree_or(terms[mid:])
+
+
 class WishboneArbiter(wiring.Component):
-    bus: Out(wishbone.Signature(addr_width=30, data_width=32, granularity=8,
-                                features=("err", "cti", "bte")))
+    bus: Out(_bus_signature)
 
     def __init__(self):
-        self._port_map = dict()
+        self._port_map   = dict()
+        self._priorities = []
         super().__init__()
 
     def port(self, priority):
@@ -22,59 +43,42 @@ class WishboneArbiter(wiring.Component):
                             .format(priority))
         if priority in self._port_map:
             raise ValueError("Conflicting priority: '{!r}'".format(priority))
-        port = wishbone.Interface(addr_width=30, data_width=32, granularity=8,
-                                  features=("err", "cti", "bte"))
+        port = _bus_signature.create()
         self._port_map[priority] = port
+        insort(self._priorities, priority)
         return port
 
     def elaborate(self, platform):
         m = Module()
 
-        ports = [port for priority, port in sorted(self._port_map.items())]
+        ports = [self._port_map[priority] for priority in self._priorities]
+
+        if len(ports) == 1:
+            port, = ports
+            for name in _FANOUT_FIELDS:
+                m.d.comb += getattr(self.bus, name).eq(getattr(port, name))
+            for name in _FANIN_FIELDS:
+                m.d.comb += getattr(port, name).eq(getattr(self.bus, name))
+            return m
 
         req = Signal(len(ports))
         gnt = Signal.like(req)
 
-        with m.If(~self.bus.cyc):
-            for i, port in enumerate(ports):
-                m.d.sync += req[i].eq(port.cyc)
+        m.d.sync += req.eq(Mux(self.bus.cyc, req, Cat(port.cyc for port in ports)))
 
         m.d.comb += gnt.eq(req & (-req)) # isolate rightmost 1-bit
 
-        bus_adr_mux   = 0
-        bus_dat_w_mux = 0
-        bus_sel_mux   = 0
-        bus_cyc_mux   = 0
-        bus_stb_mux   = 0
-        bus_we_mux    = 0
-        bus_cti_mux   = 0
-        bus_bte_mux   = 0
+        bus_mux = {name: [] for name in _FANOUT_FIELDS}
 
         for i, port in enumerate(ports):
-            bus_adr_mux   |= Mux(gnt[i], port.adr,   0)
-            bus_dat_w_mux |= Mux(gnt[i], port.dat_w, 0)
-            bus_sel_mux   |= Mux(gnt[i], port.sel,   0)
-            bus_cyc_mux   |= Mux(gnt[i], port.cyc,   0)
-            bus_stb_mux   |= Mux(gnt[i], port.stb,   0)
-            bus_we_mux    |= Mux(gnt[i], port.we,    0)
-            bus_cti_mux   |= Mux(gnt[i], port.cti,   0)
-            bus_bte_mux   |= Mux(gnt[i], port.bte,   0)
-
-            m.d.comb += [
-                port.dat_r.eq(self.bus.dat_r),
-                port.ack  .eq(self.bus.ack & gnt[i]),
-                port.err  .eq(self.bus.err & gnt[i]),
-            ]
-
-        m.d.comb += [
-            self.bus.adr  .eq(bus_adr_mux),
-            self.bus.dat_w.eq(bus_dat_w_mux),
-            self.bus.sel  .eq(bus_sel_mux),
-            self.bus.cyc  .eq(bus_cyc_mux),
-            self.bus.stb  .eq(bus_stb_mux),
-            self.bus.we   .eq(bus_we_mux),
-            self.bus.cti  .eq(bus_cti_mux),
-            self.bus.bte  .eq(bus_bte_mux),
-        ]
+            for name in _FANOUT_FIELDS:
+                bus_mux[name].append(Mux(gnt[i], getattr(port, name), 0))
+            for name in _FANIN_FIELDS:
+                m.d.comb += getattr(port, name).eq(Mux(gnt[i], getattr(self.bus, name), 0))
+
+        # Reduce the gated terms as a balanced tree rather than a chain, so that the depth of
+        # each bus signal grows with log2 of the number of ports.
+        for name in _FANOUT_FIELDS:
+            m.d.comb += getattr(self.bus, name).eq(_tree_or(bus_mux[name]))
 
         return m
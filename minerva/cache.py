@@ -129,6 +129,10 @@ class L1Cache(wiring.Component):
         flush_line = Signal(range(self.nlines), init=self.nlines - 1)
         flush_done = Signal()
 
+        # Whether the current refill beat is the last one. It is computed one beat ahead, so that
+        # bus_last is driven from a register rather than from a comparator on bus_addr.
+        refill_last = Signal()
+
         with m.If(self.s1_ready):
             m.d.sync += flush_line.eq(flush_line.init)
 
@@ -145,6 +149,7 @@ class L1Cache(wiring.Component):
                         self.bus_addr.word.eq(0),
                         self.bus_addr.line.eq(self.s2_addr.line),
                         self.bus_addr.tag .eq(self.s2_addr.tag),
+                        refill_last       .eq(0),
                     ]
                     m.next = "REFILL"
                 with m.Else():
@@ -174,7 +179,7 @@ class L1Cache(wiring.Component):
             with m.State("REFILL"):
                 m.d.comb += [
                     self.bus_req .eq(1),
-                    self.bus_last.eq(self.bus_addr.word == Const(self.nwords - 1)),
+                    self.bus_last.eq(refill_last),
                 ]
                 for i, way in enumerate(self._ways):
                     m.d.comb += [
@@ -190,7 +195,10 @@ class L1Cache(wiring.Component):
                             m.d.sync += way_lru.eq(~way_lru)
                             m.next = "DONE"
                         with m.Else():
-                            m.d.sync += self.bus_addr.word.eq(self.bus_addr.word + 1)
+                            m.d.sync += [
+                                self.bus_addr.word.eq(self.bus_addr.word + 1),
+                                refill_last       .eq(self.bus_addr.word == Const(self.nwords - 2)),
+                            ]
 
             with m.State("DONE"):
                 m.next = "CHECK"
@@ -55,6 +55,7 @@ _dx_layout = StructLayout({
     "bypass_x":              1,
     "bypass_m":              1,
     "funct3":                3,
+    "mem_width":             mem_width_layout,
     "lui":                   1,
     "auipc":                 1,
     "load":                  1,
@@ -95,7 +96,7 @@ _xm_layout = StructLayout({
     "rd":                    5,
     "rd_we":                 1,
     "bypass_m":              1,
-    "funct3":                3,
+    "mem_width":             mem_width_layout,
     "result":               32,
     "shift":                 1,
     "load":                  1,
@@ -118,7 +119,7 @@ _mw_layout = StructLayout({
     "pc":         32,
     "rd":          5,
     "rd_we":       1,
-    "funct3":      3,
+    "mem_width":  mem_width_layout,
     "result":     32,
     "load":        1,
     "load_data":  32,
@@ -233,7 +234,7 @@ class Minerva(wiring.Component):
         if with_rvfi:
             self._rvficon = RVFIController(self._csrf.memory_map)
             members.update({
-                "rvfi": Out(RVFISignature(self._csrf.memory_map))
+                "rvfi": Out(self._rvficon.signature.members["rvfi"].signature)
             })
 
         super().__init__(members)
@@ -475,10 +476,10 @@ class Minerva(wiring.Component):
 
         m.d.comb += [
             self._data_sel.x_offset       .eq(self._adder.x_result[:2]),
-            self._data_sel.x_funct3       .eq(self._x.sink.p.funct3),
+            self._data_sel.x_mem_width    .eq(self._x.sink.p.mem_width),
             self._data_sel.x_store_operand.eq(self._gprf.x_rp2_data),
             self._data_sel.w_offset       .eq(self._w.sink.p.result[:2]),
-            self._data_sel.w_funct3       .eq(self._w.sink.p.funct3),
+            self._data_sel.w_mem_width    .eq(self._w.sink.p.mem_width),
             self._data_sel.w_load_data    .eq(self._w.sink.p.load_data)
         ]
 
@@ -671,11 +672,22 @@ class Minerva(wiring.Component):
         # D/X
 
         d_adder_sub = Signal()
+        d_mem_width = Signal(mem_width_layout)
 
         m.d.comb += d_adder_sub.eq( self._decoder.adder & self._decoder.adder_sub
                                     | self._decoder.compare
                                     | self._decoder.branch)
 
+        # The access width of loads and stores is decoded once here, and carried as a one-hot
+        # through the X, M and W stages.
+        m.d.comb += [
+            d_mem_width.b .eq(self._decoder.funct3 == Funct3.B),
+            d_mem_width.bu.eq(self._decoder.funct3 == Funct3.BU),
+            d_mem_width.h .eq(self._decoder.funct3 == Funct3.H),
+            d_mem_width.hu.eq(self._decoder.funct3 == Funct3.HU),
+            d_mem_width.w .eq(self._decoder.funct3 == Funct3.W),
+        ]
+
         with m.If(self._d.ready):
             m.d.sync += [
                 self._d.source.p.pc                  .eq(self._d.sink.p.pc),
@@ -691,6 +703,7 @@ class Minerva(wiring.Component):
                 self._d.source.p.bypass_x            .eq(self._decoder.bypass_x),
                 self._d.source.p.bypass_m            .eq(self._decoder.bypass_m),
                 self._d.source.p.funct3              .eq(self._decoder.funct3),
+                self._d.source.p.mem_width           .eq(d_mem_width),
                 self._d.source.p.lui                 .eq(self._decoder.lui),
                 self._d.source.p.auipc               .eq(self._decoder.auipc),
                 self._d.source.p.load                .eq(self._decoder.load),
@@ -754,7 +767,7 @@ class Minerva(wiring.Component):
                 self._x.source.p.rd                  .eq(self._x.sink.p.rd),
                 self._x.source.p.rd_we               .eq(self._x.sink.p.rd_we),
                 self._x.source.p.bypass_m            .eq(x_bypass_m),
-                self._x.source.p.funct3              .eq(self._x.sink.p.funct3),
+                self._x.source.p.mem_width           .eq(self._x.sink.p.mem_width),
                 self._x.source.p.load                .eq(self._x.sink.p.load),
                 self._x.source.p.store               .eq(self._x.sink.p.store),
                 self._x.source.p.store_data          .eq(self._loadstore.x_store_data),
@@ -783,7 +796,7 @@ class Minerva(wiring.Component):
                 self._m.source.p.pc        .eq(self._m.sink.p.pc),
                 self._m.source.p.rd        .eq(self._m.sink.p.rd),
                 self._m.source.p.load      .eq(self._m.sink.p.load),
-                self._m.source.p.funct3    .eq(self._m.sink.p.funct3),
+                self._m.source.p.mem_width .eq(self._m.sink.p.mem_width),
                 self._m.source.p.load_data .eq(self._loadstore.m_load_data),
                 self._m.source.p.rd_we     .eq(self._m.sink.p.rd_we),
                 self._m.source.p.result    .eq(m_result),
@@ -8,16 +8,18 @@ __all__ = ["Stage"]
 
 class Stage(wiring.Component):
     def __init__(self, sink_layout, source_layout, *, sink_init=None, source_init=None):
-        self._kill_any  = 0
-        self._stall_any = 0
+        self._kill_any   = 0
+        self._stall_any  = 0
+        self._has_sink   = sink_layout   is not None
+        self._has_source = source_layout is not None
 
         members = {
             "valid": Out(1),
             "ready": Out(1),
         }
-        if sink_layout is not None:
+        if self._has_sink:
             members["sink"] = In(stream.Signature(sink_layout, payload_init=sink_init))
-        if source_layout is not None:
+        if self._has_source:
             members["source"] = Out(stream.Signature(source_layout, payload_init=source_init))
 
         super().__init__(members)
@@ -31,13 +33,13 @@ class Stage(wiring.Component):
     def elaborate(self, platform):
         m = Module()
 
-        if hasattr(self, "sink"):
+        if self._has_sink:
             m.d.comb += self.sink.ready.eq(self.ready)
             m.d.comb += self.valid.eq(self.sink.valid & ~self._kill_any)
         else:
             m.d.comb += self.valid.eq(~self._kill_any)
 
-        if hasattr(self, "source"):
+        if self._has_source:
             with m.If(self.ready):
                 m.d.sync += self.source.valid.eq(self.valid)
             with m.Elif(self.source.ready):
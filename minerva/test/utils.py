@@ -1,3 +1,4 @@
+import hashlib
 import os
 import shutil
 import subprocess
@@ -9,7 +10,16 @@ from amaranth import *
 from amaranth.back import rtlil
 
 
-__all__ = ["FormalTestCase"]
+__all__ = ["run_simulation", "FormalTestCase"]
+
+
+def run_simulation(sim, vcd_name):
+    # Waveforms are only dumped if MINERVA_VCD is set, to `<vcd_name>.vcd`.
+    if os.getenv("MINERVA_VCD"):
+        with sim.write_vcd(vcd_file=f"{vcd_name}.vcd"):
+            sim.run()
+    else:
+        sim.run()
 
 
 # Taken from amaranth.test.utils.FHDLTestCase
@@ -24,10 +34,6 @@ class FormalTestCase(unittest.TestCase):
             caller.name.replace("test_", "")
         )
 
-        # The sby -f switch seems not fully functional when sby is reading from stdin.
-        if os.path.exists(os.path.join(spec_dir, spec_name)):
-            shutil.rmtree(os.path.join(spec_dir, spec_name))
-
         if mode == "hybrid":
             script = "setattr -unset init w:* a:amaranth.sample_reg %d"
             mode   = "bmc"
@@ -56,9 +62,29 @@ class FormalTestCase(unittest.TestCase):
             script=script,
             rtlil=rtlil.convert(Fragment.get(spec, platform="formal"), ports=())
         )
+
+        # If MINERVA_FORMAL_CACHE is set, skip the check if the same configuration has already
+        # passed, as recorded by a previous run in the work directory. This does not account for
+        # changes in the toolchain, and is therefore opt-in.
+        spec_path   = os.path.join(spec_dir, spec_name)
+        config_hash = hashlib.blake2b(config.encode("utf-8")).hexdigest()
+        hash_path   = os.path.join(spec_path, "config.blake2b")
+        if (os.getenv("MINERVA_FORMAL_CACHE") and
+                os.path.exists(os.path.join(spec_path, "PASS")) and os.path.exists(hash_path)):
+            with open(hash_path) as f:
+                if f.read() == config_hash:
+                    return
+
+        # The sby -f switch seems not fully functional when sby is reading from stdin.
+        if os.path.exists(spec_path):
+            shutil.rmtree(spec_path)
+
         with subprocess.Popen(["pdm", "run", "yowasp-sby", "-f", "-d", spec_name], cwd=spec_dir,
                               universal_newlines=True,
                               stdin=subprocess.PIPE, stdout=subprocess.PIPE) as proc:
             stdout, stderr = proc.communicate(config)
             if proc.returncode != 0:
                 self.fail("Formal verification failed:\n" + stdout)
+
+        with open(hash_path, "w") as f:
+            f.write(config_hash)
@@ -9,50 +9,56 @@ from amaranth_soc import wishbone
 from amaranth_soc.wishbone import CycleType
 
 from ..cache import *
-from ..isa import Funct3
 from ..arbiter import WishboneArbiter
 
 
-__all__ = ["DataSelector", "BareLoadStoreUnit", "CachedLoadStoreUnit"]
+__all__ = ["mem_width_layout", "DataSelector", "BareLoadStoreUnit", "CachedLoadStoreUnit"]
+
+
+# Width of a memory access, predecoded from funct3.
+mem_width_layout = StructLayout({
+    "b":  1,
+    "bu": 1,
+    "h":  1,
+    "hu": 1,
+    "w":  1,
+})
 
 
 class DataSelector(wiring.Component):
     x_offset:        In(2)
-    x_funct3:        In(3)
+    x_mem_width:     In(mem_width_layout)
     x_store_operand: In(32)
     x_misaligned:    Out(1)
     x_mask:          Out(4)
     x_store_data:    Out(32)
 
     w_offset:        In(2)
-    w_funct3:        In(3)
+    w_mem_width:     In(mem_width_layout)
     w_load_data:     In(32)
     w_load_result:   Out(signed(32))
 
     def elaborate(self, platform):
         m = Module()
 
-        with m.Switch(self.x_funct3):
-            with m.Case(Funct3.H, Funct3.HU):
-                m.d.comb += self.x_misaligned.eq(self.x_offset[0])
-            with m.Case(Funct3.W):
-                m.d.comb += self.x_misaligned.eq(self.x_offset.bool())
-
-        with m.Switch(self.x_funct3):
-            with m.Case(Funct3.B, Funct3.BU):
-                m.d.comb += self.x_mask.eq(0b1 << self.x_offset)
-            with m.Case(Funct3.H, Funct3.HU):
-                m.d.comb += self.x_mask.eq(0b11 << self.x_offset)
-            with m.Case(Funct3.W):
-                m.d.comb += self.x_mask.eq(0b1111)
-
-        with m.Switch(self.x_funct3):
-            with m.Case(Funct3.B):
-                m.d.comb += self.x_store_data.eq(self.x_store_operand[:8] << self.x_offset*8)
-            with m.Case(Funct3.H):
-                m.d.comb += self.x_store_data.eq(self.x_store_operand[:16] << self.x_offset[1]*16)
-            with m.Case(Funct3.W):
-                m.d.comb += self.x_store_data.eq(self.x_store_operand)
+        with m.If(self.x_mem_width.h | self.x_mem_width.hu):
+            m.d.comb += self.x_misaligned.eq(self.x_offset[0])
+        with m.Elif(self.x_mem_width.w):
+            m.d.comb += self.x_misaligned.eq(self.x_offset.bool())
+
+        with m.If(self.x_mem_width.b | self.x_mem_width.bu):
+            m.d.comb += self.x_mask.eq(0b1 << self.x_offset)
+        with m.Elif(self.x_mem_width.h | self.x_mem_width.hu):
+            m.d.comb += self.x_mask.eq(0b11 << self.x_offset)
+        with m.Elif(self.x_mem_width.w):
+            m.d.comb += self.x_mask.eq(0b1111)
+
+        with m.If(self.x_mem_width.b):
+            m.d.comb += self.x_store_data.eq(self.x_store_operand[:8] << self.x_offset*8)
+        with m.Elif(self.x_mem_width.h):
+            m.d.comb += self.x_store_data.eq(self.x_store_operand[:16] << self.x_offset[1]*16)
+        with m.Elif(self.x_mem_width.w):
+            m.d.comb += self.x_store_data.eq(self.x_store_operand)
 
         w_byte = Signal(signed(8))
         w_half = Signal(signed(16))
@@ -62,17 +68,16 @@ class DataSelector(wiring.Component):
             w_half.eq(self.w_load_data.word_select(self.w_offset[1], 16))
         ]
 
-        with m.Switch(self.w_funct3):
-            with m.Case(Funct3.B):
-                m.d.comb += self.w_load_result.eq(w_byte)
-            with m.Case(Funct3.BU):
-                m.d.comb += self.w_load_result.eq(Cat(w_byte, 0))
-            with m.Case(Funct3.H):
-                m.d.comb += self.w_load_result.eq(w_half)
-            with m.Case(Funct3.HU):
-                m.d.comb += self.w_load_result.eq(Cat(w_half, 0))
-            with m.Case(Funct3.W):
-                m.d.comb += self.w_load_result.eq(self.w_load_data)
+        with m.If(self.w_mem_width.b):
+            m.d.comb += self.w_load_result.eq(w_byte)
+        with m.Elif(self.w_mem_width.bu):
+            m.d.comb += self.w_load_result.eq(Cat(w_byte, 0))
+        with m.Elif(self.w_mem_width.h):
+            m.d.comb += self.w_load_result.eq(w_half)
+        with m.Elif(self.w_mem_width.hu):
+            m.d.comb += self.w_load_result.eq(Cat(w_half, 0))
+        with m.Elif(self.w_mem_width.w):
+            m.d.comb += self.w_load_result.eq(self.w_load_data)
 
         return m
 
@@ -101,41 +106,51 @@ class BareLoadStoreUnit(wiring.Component):
     def elaborate(self, platform):
         m = Module()
 
-        with m.If(self.dbus.cyc):
-            with m.If(self.dbus.ack | self.dbus.err):
-                m.d.sync += [
-                    self.dbus.cyc.eq(0),
-                    self.dbus.stb.eq(0),
-                    self.m_load_data.eq(self.dbus.dat_r)
-                ]
-        with m.Elif((self.x_load | self.x_store) & self.x_valid & self.x_ready):
-            m.d.sync += [
-                self.dbus.cyc.eq(1),
-                self.dbus.stb.eq(1),
-                self.dbus.adr.eq(self.x_addr[2:]),
-                self.dbus.sel.eq(self.x_mask),
-                self.dbus.we.eq(self.x_store),
-                self.dbus.dat_w.eq(self.x_store_data)
-            ]
-
-        with m.If(self.dbus.cyc & self.dbus.err):
+        with m.FSM() as fsm:
+            with m.State("IDLE"):
+                with m.If((self.x_load | self.x_store) & self.x_valid & self.x_ready):
+                    m.d.sync += [
+                        self.dbus.cyc.eq(1),
+                        self.dbus.stb.eq(1),
+                        self.dbus.adr.eq(self.x_addr[2:]),
+                        self.dbus.sel.eq(self.x_mask),
+                        self.dbus.we.eq(self.x_store),
+                        self.dbus.dat_w.eq(self.x_store_data)
+                    ]
+                    m.next = "BUSY"
+
+            with m.State("BUSY"):
+                with m.If(self.dbus.ack | self.dbus.err):
+                    m.d.sync += [
+                        self.dbus.cyc.eq(0),
+                        self.dbus.stb.eq(0),
+                        self.m_load_data.eq(self.dbus.dat_r)
+                    ]
+                    m.next = "IDLE"
+
+        m_bus_error = Signal()
+        m_was_store = Signal()
+
+        with m.If(fsm.ongoing("BUSY") & self.dbus.err):
             m.d.sync += [
-                self.m_load_error.eq(~self.dbus.we),
-                self.m_store_error.eq(self.dbus.we),
+                m_bus_error.eq(1),
+                m_was_store.eq(self.dbus.we),
                 self.m_badaddr.eq(self.dbus.adr)
             ]
         with m.Elif(self.m_ready):
-            m.d.sync += [
-                self.m_load_error.eq(0),
-                self.m_store_error.eq(0)
-            ]
+            m.d.sync += m_bus_error.eq(0)
 
-        m.d.comb += self.x_busy.eq(self.dbus.cyc)
+        m.d.comb += [
+            self.m_load_error .eq(m_bus_error & ~m_was_store),
+            self.m_store_error.eq(m_bus_error &  m_was_store),
+        ]
+
+        m.d.comb += self.x_busy.eq(fsm.ongoing("BUSY"))
 
-        with m.If(self.m_load_error | self.m_store_error):
+        with m.If(m_bus_error):
             m.d.comb += self.m_busy.eq(0)
         with m.Else():
-            m.d.comb += self.m_busy.eq(self.dbus.cyc)
+            m.d.comb += self.m_busy.eq(fsm.ongoing("BUSY"))
 
         return m
 
@@ -154,7 +169,9 @@ class WriteBuffer(wiring.Component):
             "r_en":  In(1),
             "r_rdy": Out(1),
             "r_op":  Out(op_layout),
+            "empty": Out(1),
         })
+        self._granularity = granularity
         self._fifo = SyncFIFOBuffered(width=len(self.w_op.as_value()), depth=depth)
 
 
@@ -162,14 +179,49 @@ class WriteBuffer(wiring.Component):
         m = Module()
 
         m.submodules.fifo = self._fifo
+
+        # The most recent write is held in a pending register in front of the FIFO. Writes to the
+        # same address are merged into it while the FIFO is being drained, so that a sequence of
+        # stores to a word results in a single bus transaction.
+
+        pend_valid = Signal()
+        pend_op    = Signal.like(self.w_op)
+        pend_merge = Signal()
+        pend_push  = Signal()
+
         m.d.comb += [
-            self.w_rdy.eq(self._fifo.w_rdy),
-            self._fifo.w_en  .eq(self.w_en),
-            self._fifo.w_data.eq(self.w_op),
+            pend_merge.eq(pend_valid & (pend_op.addr == self.w_op.addr) & self._fifo.r_rdy),
+            pend_push .eq(pend_valid & (~self._fifo.r_rdy | self.w_en & ~pend_merge)),
+
+            self._fifo.w_en  .eq(pend_push),
+            self._fifo.w_data.eq(pend_op),
+        ]
+
+        with m.If(self.w_en):
+            with m.If(pend_merge):
+                for i in range(len(self.w_op.mask)):
+                    with m.If(self.w_op.mask[i]):
+                        m.d.sync += [
+                            pend_op.mask[i].eq(1),
+                            pend_op.data.word_select(i, self._granularity)
+                                        .eq(self.w_op.data.word_select(i, self._granularity)),
+                        ]
+            with m.Else():
+                m.d.sync += [
+                    pend_valid.eq(1),
+                    pend_op   .eq(self.w_op),
+                ]
+        with m.Elif(pend_push & self._fifo.w_rdy):
+            m.d.sync += pend_valid.eq(0)
+
+        m.d.comb += [
+            self.w_rdy.eq(~pend_valid | self._fifo.w_rdy),
 
             self._fifo.r_en.eq(self.r_en),
             self.r_rdy.eq(self._fifo.r_rdy),
             self.r_op .eq(self._fifo.r_data),
+
+            self.empty.eq(~pend_valid & (self._fifo.w_level == 0)),
         ]
 
         return m
@@ -278,21 +330,53 @@ class CachedLoadStoreUnit(wiring.Component):
         connect(m, dbus_arbiter.bus, flipped(self.dbus))
 
         wrbuf_port = dbus_arbiter.port(priority=0)
+
+        # The write at the head of the write buffer is moved into a lookahead register, from which
+        # it is issued on the bus. When a write is issued, the write buffer output holds the next
+        # one, if any. If it targets the following word, the issued write is tagged INCR_BURST and
+        # its successor is issued as soon as it is acknowledged. CTI is registered with the address,
+        # and is stable for the whole beat.
+
+        wrbuf_la_valid = Signal()
+        wrbuf_la_op    = Signal.like(self._wrbuf.r_op)
+        wrbuf_la_load  = Signal()
+        wrbuf_issue    = Signal()
+
         m.d.comb += [
-            wrbuf_port.cyc.eq(self._wrbuf.r_rdy),
+            wrbuf_issue.eq(wrbuf_la_valid & (~wrbuf_port.stb |
+                                             (wrbuf_port.ack | wrbuf_port.err) &
+                                             (wrbuf_port.cti == CycleType.INCR_BURST))),
+            wrbuf_la_load.eq(self._wrbuf.r_rdy & (~wrbuf_la_valid | wrbuf_issue)),
+
+            self._wrbuf.r_en.eq(wrbuf_la_load),
+
+            wrbuf_port.cyc.eq(~self._wrbuf.empty | wrbuf_la_valid | wrbuf_port.stb),
             wrbuf_port.we.eq(Const(1)),
         ]
-        with m.If(wrbuf_port.stb):
-            with m.If(wrbuf_port.ack | wrbuf_port.err):
-                m.d.sync += wrbuf_port.stb.eq(0)
-                m.d.comb += self._wrbuf.r_en.eq(1)
-        with m.Elif(self._wrbuf.r_rdy):
+
+        with m.If(wrbuf_la_load):
+            m.d.sync += [
+                wrbuf_la_valid.eq(1),
+                wrbuf_la_op   .eq(self._wrbuf.r_op),
+            ]
+        with m.Elif(wrbuf_issue):
+            m.d.sync += wrbuf_la_valid.eq(0)
+
+        with m.If(wrbuf_issue):
             m.d.sync += [
                 wrbuf_port.stb  .eq(1),
-                wrbuf_port.adr  .eq(self._wrbuf.r_op.addr),
-                wrbuf_port.sel  .eq(self._wrbuf.r_op.mask),
-                wrbuf_port.dat_w.eq(self._wrbuf.r_op.data),
+                wrbuf_port.adr  .eq(wrbuf_la_op.addr),
+                wrbuf_port.sel  .eq(wrbuf_la_op.mask),
+                wrbuf_port.dat_w.eq(wrbuf_la_op.data),
             ]
+            with m.If(self._wrbuf.r_rdy & (self._wrbuf.r_op.addr == wrbuf_la_op.addr + 1)):
+                m.d.sync += wrbuf_port.cti.eq(CycleType.INCR_BURST)
+            with m.Elif(wrbuf_port.stb):
+                m.d.sync += wrbuf_port.cti.eq(CycleType.END_OF_BURST)
+            with m.Else():
+                m.d.sync += wrbuf_port.cti.eq(CycleType.CLASSIC)
+        with m.Elif(wrbuf_port.stb & (wrbuf_port.ack | wrbuf_port.err)):
+            m.d.sync += wrbuf_port.stb.eq(0)
 
         dcache_port = dbus_arbiter.port(priority=1)
         m.d.comb += [
@@ -325,20 +409,25 @@ class CachedLoadStoreUnit(wiring.Component):
                 bare_port.dat_w.eq(self.x_store_data)
             ]
 
+        m_bus_error = Signal()
+        m_was_store = Signal()
+
         with m.If(self.dbus.cyc & self.dbus.err):
             m.d.sync += [
-                self.m_load_error.eq(~self.dbus.we),
-                self.m_store_error.eq(self.dbus.we),
+                m_bus_error.eq(1),
+                m_was_store.eq(self.dbus.we),
                 self.m_badaddr.eq(self.dbus.adr)
             ]
         with m.Elif(self.m_ready):
-            m.d.sync += [
-                self.m_load_error.eq(0),
-                self.m_store_error.eq(0)
-            ]
+            m.d.sync += m_bus_error.eq(0)
+
+        m.d.comb += [
+            self.m_load_error .eq(m_bus_error & ~m_was_store),
+            self.m_store_error.eq(m_bus_error &  m_was_store),
+        ]
 
         with m.If(self.x_fence_i):
-            m.d.comb += self.x_busy.eq(self._wrbuf.r_rdy)
+            m.d.comb += self.x_busy.eq(wrbuf_port.cyc)
         with m.Elif(x_dcache_select):
             m.d.comb += self.x_busy.eq(self.x_store & ~self._wrbuf.w_rdy)
         with m.Else():
@@ -2,8 +2,6 @@ from amaranth import *
 from amaranth.lib import wiring
 from amaranth.lib.wiring import In, Out
 
-from ..isa import Funct3
-
 
 __all__ = ["LogicUnit"]
 
@@ -17,12 +15,13 @@ class LogicUnit(wiring.Component):
     def elaborate(self, platform):
         m = Module()
 
-        with m.Switch(self.op):
-            with m.Case(Funct3.XOR):
-                m.d.comb += self.result.eq(self.src1 ^ self.src2)
-            with m.Case(Funct3.OR):
-                m.d.comb += self.result.eq(self.src1 | self.src2)
-            with m.Case(Funct3.AND):
-                m.d.comb += self.result.eq(self.src1 & self.src2)
+        # XOR, OR and AND are encoded as 0b100, 0b110 and 0b111 (see Funct3), so they can be told
+        # apart from op[1] and op[0] without decoding all 3 bits.
+        with m.If(~self.op[1]):
+            m.d.comb += self.result.eq(self.src1 ^ self.src2)
+        with m.Elif(~self.op[0]):
+            m.d.comb += self.result.eq(self.src1 | self.src2)
+        with m.Else():
+            m.d.comb += self.result.eq(self.src1 & self.src2)
 
         return m
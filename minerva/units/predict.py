@@ -19,9 +19,23 @@ class BranchPredictor(wiring.Component):
         m = Module()
 
         d_fetch_misaligned = Signal()
+
+        # The branch target adder is split into a carry-select adder: both possible values of the
+        # upper half are computed in parallel to the lower half, which then selects one of them.
+        d_target_lo  = Signal(17)
+        d_target_hi0 = Signal(16)
+        d_target_hi1 = Signal(16)
+
+        m.d.comb += [
+            d_target_lo .eq(self.d_pc[:16] + self.d_offset[:16]),
+            d_target_hi0.eq(self.d_pc[16:] + self.d_offset[16:]),
+            d_target_hi1.eq(self.d_pc[16:] + self.d_offset[16:] + 1),
+        ]
+
         m.d.comb += [
-            d_fetch_misaligned.eq(self.d_pc[:2].bool() | self.d_offset[:2].bool()),
-            self.d_branch_target.eq(self.d_pc + self.d_offset),
+            d_fetch_misaligned.eq(Cat(self.d_pc[:2], self.d_offset[:2]).any()),
+            self.d_branch_target.eq(Cat(d_target_lo[:16],
+                                        Mux(d_target_lo[16], d_target_hi1, d_target_hi0))),
         ]
 
         with m.If(d_fetch_misaligned):
@@ -1,8 +1,6 @@
-from functools import reduce
-from operator import or_
-
 from amaranth import *
 from amaranth.lib import wiring
+from amaranth.lib.data import StructLayout, ArrayLayout
 from amaranth.lib.wiring import In, Out
 
 from amaranth_soc.memory import MemoryMap
@@ -17,35 +15,38 @@ __all__ = ["RVFISignature", "RVFIController"]
 # RISC-V Formal Interface
 
 class RVFISignature(wiring.Signature):
+    _STATIC_MEMBERS = {
+        "valid":     Out(1),
+        "order":     Out(64),
+        "insn":      Out(32),
+        "trap":      Out(1),
+        "halt":      Out(1),
+        "intr":      Out(1),
+        "mode":      Out(2, init=3), # M-mode
+        "ixl":       Out(2, init=1), # XLEN=32
+
+        "rs1_addr":  Out(5),
+        "rs2_addr":  Out(5),
+        "rs1_rdata": Out(32),
+        "rs2_rdata": Out(32),
+        "rd_addr":   Out(5),
+        "rd_wdata":  Out(32),
+
+        "pc_rdata":  Out(32),
+        "pc_wdata":  Out(32),
+
+        "mem_addr":  Out(32),
+        "mem_rmask": Out(4),
+        "mem_wmask": Out(4),
+        "mem_rdata": Out(32),
+        "mem_wdata": Out(32),
+    }
+
     def __init__(self, csr_map):
         assert isinstance(csr_map, MemoryMap)
-        members = {
-            "valid":     Out(1),
-            "order":     Out(64),
-            "insn":      Out(32),
-            "trap":      Out(1),
-            "halt":      Out(1),
-            "intr":      Out(1),
-            "mode":      Out(2),
-            "ixl":       Out(2),
-
-            "rs1_addr":  Out(5),
-            "rs2_addr":  Out(5),
-            "rs1_rdata": Out(32),
-            "rs2_rdata": Out(32),
-            "rd_addr":   Out(5),
-            "rd_wdata":  Out(32),
-
-            "pc_rdata":  Out(32),
-            "pc_wdata":  Out(32),
-
-            "mem_addr":  Out(32),
-            "mem_rmask": Out(4),
-            "mem_wmask": Out(4),
-            "mem_rdata": Out(32),
-            "mem_wdata": Out(32),
-        }
-        for res_info in csr_map.all_resources():
+        self._csr_infos = tuple(csr_map.all_resources())
+        members = dict(self._STATIC_MEMBERS)
+        for res_info in self._csr_infos:
             csr_name = res_info.path[-1][0]
             members.update({
                 f"csr_{csr_name}_rmask": Out(32),
@@ -55,13 +56,40 @@ class RVFISignature(wiring.Signature):
             })
         super().__init__(members)
 
+    @property
+    def csr_infos(self):
+        return self._csr_infos
+
+
+_x_pipe_layout = StructLayout({
+    "insn":        32,
+    "rs1_addr":     5,
+    "rs2_addr":     5,
+})
+
+
+_m_pipe_layout = StructLayout({
+    "insn":        32,
+    "rs1_addr":     5,
+    "rs2_addr":     5,
+    "rs1_rdata":   32,
+    "rs2_rdata":   32,
+    "mem_addr":    32,
+    "mem_wmask":    4,
+    "mem_rmask":    4,
+    "mem_wdata":   32,
+    "mtvec_base":  30,
+    "mepc_base":   30,
+})
+
 
 class RVFIController(wiring.Component):
     def __init__(self, csr_map):
         assert isinstance(csr_map, MemoryMap)
-        self._csr_map = csr_map
+        rvfi_signature = RVFISignature(csr_map)
+        self._csr_infos = rvfi_signature.csr_infos
         super().__init__({
-            "rvfi":               Out(RVFISignature(csr_map)),
+            "rvfi":               Out(rvfi_signature),
 
             "d_insn":             In(32),
             "d_rs1_addr":         In(5),
@@ -97,145 +125,147 @@ class RVFIController(wiring.Component):
     def elaborate(self, platform):
         m = Module()
 
-        m_mtvec_base = Signal(30)
-        m_mepc_base  = Signal(30)
+        d_pipe = Signal(_x_pipe_layout)
+        x_pipe = Signal(_x_pipe_layout, reset_less=True)
 
-        with m.If(self.x_ready):
-            m.d.sync += [
-                m_mtvec_base.eq(self.x_mtvec_base),
-                m_mepc_base .eq(self.x_mepc_base),
-            ]
+        m.d.comb += [
+            d_pipe.insn    .eq(self.d_insn),
+            d_pipe.rs1_addr.eq(self.d_rs1_addr),
+            d_pipe.rs2_addr.eq(self.d_rs2_addr),
+        ]
 
-        # Instruction Metadata
+        x_next = Signal(_m_pipe_layout)
+        m_pipe = Signal(_m_pipe_layout, reset_less=True)
 
-        with m.If(self.m_ready):
-            m.d.sync += self.rvfi.valid.eq(self.m_valid)
-        with m.Elif(self.rvfi.valid):
-            m.d.sync += self.rvfi.valid.eq(0)
+        m.d.comb += [
+            x_next.insn      .eq(x_pipe.insn),
+            x_next.rs1_addr  .eq(x_pipe.rs1_addr),
+            x_next.rs2_addr  .eq(x_pipe.rs2_addr),
+            x_next.rs1_rdata .eq(self.x_rs1_rdata),
+            x_next.rs2_rdata .eq(self.x_rs2_rdata),
+            x_next.mem_addr  .eq(self.x_mem_addr),
+            x_next.mem_wmask .eq(self.x_mem_wmask),
+            x_next.mem_rmask .eq(self.x_mem_rmask),
+            x_next.mem_wdata .eq(self.x_mem_wdata),
+            x_next.mtvec_base.eq(self.x_mtvec_base),
+            x_next.mepc_base .eq(self.x_mepc_base),
+        ]
 
-        with m.If(self.rvfi.valid):
-            m.d.sync += self.rvfi.order.eq(self.rvfi.order + 1)
+        m_mtvec_target = Signal(32)
+        m_mepc_target  = Signal(32)
 
-        x_insn = Signal.like(self.rvfi.insn)
-        m_insn = Signal.like(self.rvfi.insn)
+        m.d.comb += [
+            m_mtvec_target.eq(m_pipe.mtvec_base << 2),
+            m_mepc_target .eq(m_pipe.mepc_base  << 2),
+        ]
 
-        with m.If(self.d_ready):
-            m.d.sync += x_insn.eq(self.d_insn)
-        with m.If(self.x_ready):
-            m.d.sync += m_insn.eq(x_insn)
-        with m.If(self.m_ready):
-            m.d.sync += self.rvfi.insn.eq(m_insn)
+        # The next PC is selected in two steps, with the incremented PC and the redirection target
+        # registered separately, so that the adder and the target mux are not in series.
 
-        with m.If(self.m_ready):
-            m.d.sync += [
-                self.rvfi.trap.eq(reduce(or_, (
-                    self.m_fetch_misaligned,
-                    self.m_illegal_insn,
-                    self.m_load_misaligned,
-                    self.m_store_misaligned
-                ))),
-                self.rvfi.intr.eq(self.m_pc_rdata == (m_mtvec_base << 2))
-            ]
+        m_pc_redirect = Signal()
+        m_pc_target   = Signal(32)
+        w_pc_redirect = Signal(reset_less=True)
+        w_pc_target   = Signal(32, reset_less=True)
+        w_pc_plus4    = Signal(32, reset_less=True)
 
-        m.d.comb += [
-            self.rvfi.mode.eq(Const(3)), # M-mode
-            self.rvfi.ixl.eq(Const(1)) # XLEN=32
-        ]
+        m.d.comb += m_pc_redirect.eq(self.m_exception | self.m_mret | self.m_branch_taken)
+
+        with m.If(self.m_exception):
+            m.d.comb += m_pc_target.eq(m_mtvec_target)
+        with m.Elif(self.m_mret):
+            m.d.comb += m_pc_target.eq(m_mepc_target)
+        with m.Else():
+            m.d.comb += m_pc_target.eq(self.m_branch_target)
+
+        # The read data of every CSR is carried through the M and W stages in a single bank.
+
+        csr_infos = self._csr_infos
+        for res_info in csr_infos:
+            assert isinstance(res_info.resource, csr.Register)
 
-        # Integer Register Read/Write
+        m_csr_rdata = Signal(ArrayLayout(32, len(csr_infos)), reset_less=True)
+        w_csr_rdata = Signal(ArrayLayout(32, len(csr_infos)), reset_less=True)
 
-        x_rs1_addr  = Signal.like(self.rvfi.rs1_addr)
-        x_rs2_addr  = Signal.like(self.rvfi.rs2_addr)
+        # Pipeline registers
 
-        m_rs1_addr  = Signal.like(self.rvfi.rs1_addr)
-        m_rs2_addr  = Signal.like(self.rvfi.rs2_addr)
-        m_rs1_rdata = Signal.like(self.rvfi.rs1_rdata)
-        m_rs2_rdata = Signal.like(self.rvfi.rs2_rdata)
+        # Values captured along the pipeline are grouped into one structure per stage, and every
+        # register of a given stage is updated under a single enable. The shadow registers are
+        # reset-less, as their contents are qualified by `rvfi.valid`.
 
         with m.If(self.d_ready):
-            m.d.sync += [
-                x_rs1_addr.eq(self.d_rs1_addr),
-                x_rs2_addr.eq(self.d_rs2_addr),
-            ]
+            m.d.sync += x_pipe.eq(d_pipe)
+
         with m.If(self.x_ready):
             m.d.sync += [
-                m_rs1_addr.eq(x_rs1_addr),
-                m_rs2_addr.eq(x_rs2_addr),
-                m_rs1_rdata.eq(self.x_rs1_rdata),
-                m_rs2_rdata.eq(self.x_rs2_rdata)
+                m_pipe.eq(x_next),
+                m_csr_rdata.eq(Cat(res_info.resource.x_rvfi_rdata for res_info in csr_infos)),
             ]
+
         with m.If(self.m_ready):
             m.d.sync += [
-                self.rvfi.rs1_addr.eq(m_rs1_addr),
-                self.rvfi.rs2_addr.eq(m_rs2_addr),
-                self.rvfi.rs1_rdata.eq(m_rs1_rdata),
-                self.rvfi.rs2_rdata.eq(m_rs2_rdata)
-            ]
-
-        m.d.comb += [
-            self.rvfi.rd_addr.eq(self.w_rd_addr),
-            self.rvfi.rd_wdata.eq(self.w_rd_wdata)
-        ]
+                # Instruction Metadata
+                self.rvfi.insn.eq(m_pipe.insn),
+                self.rvfi.trap.eq(Cat(
+                    self.m_fetch_misaligned,
+                    self.m_illegal_insn,
+                    self.m_load_misaligned,
+                    self.m_store_misaligned
+                ).any()),
+                self.rvfi.intr.eq(self.m_pc_rdata == m_mtvec_target),
 
-        # Program Counter
+                # Integer Register Read
+                self.rvfi.rs1_addr.eq(m_pipe.rs1_addr),
+                self.rvfi.rs2_addr.eq(m_pipe.rs2_addr),
+                self.rvfi.rs1_rdata.eq(m_pipe.rs1_rdata),
+                self.rvfi.rs2_rdata.eq(m_pipe.rs2_rdata),
 
-        m_pc_wdata = Signal.like(self.rvfi.pc_wdata)
+                # Program Counter
+                self.rvfi.pc_rdata.eq(self.m_pc_rdata),
+                w_pc_redirect.eq(m_pc_redirect),
+                w_pc_target.eq(m_pc_target),
+                w_pc_plus4.eq(self.m_pc_rdata + 4),
+
+                # Memory Access
+                self.rvfi.mem_addr.eq(m_pipe.mem_addr),
+                self.rvfi.mem_wmask.eq(m_pipe.mem_wmask),
+                self.rvfi.mem_rmask.eq(m_pipe.mem_rmask),
+                self.rvfi.mem_wdata.eq(m_pipe.mem_wdata),
+                self.rvfi.mem_rdata.eq(self.m_mem_rdata),
+
+                # CSRs
+                w_csr_rdata.eq(m_csr_rdata),
+            ]
 
-        with m.If(self.m_exception):
-            m.d.comb += m_pc_wdata.eq(m_mtvec_base << 2)
-        with m.Elif(self.m_mret):
-            m.d.comb += m_pc_wdata.eq(m_mepc_base << 2)
-        with m.Elif(self.m_branch_taken):
-            m.d.comb += m_pc_wdata.eq(self.m_branch_target)
-        with m.Else():
-            m.d.comb += m_pc_wdata.eq(self.m_pc_rdata + 4)
+        # Instruction Metadata
 
         with m.If(self.m_ready):
-            m.d.sync += [
-                self.rvfi.pc_rdata.eq(self.m_pc_rdata),
-                self.rvfi.pc_wdata.eq(m_pc_wdata)
-            ]
+            m.d.sync += self.rvfi.valid.eq(self.m_valid)
+        with m.Elif(self.rvfi.valid):
+            m.d.sync += self.rvfi.valid.eq(0)
 
-        # Memory Access
+        with m.If(self.rvfi.valid):
+            m.d.sync += self.rvfi.order.eq(self.rvfi.order + 1)
 
-        m_mem_addr  = Signal.like(self.rvfi.mem_addr)
-        m_mem_wmask = Signal.like(self.rvfi.mem_wmask)
-        m_mem_rmask = Signal.like(self.rvfi.mem_rmask)
-        m_mem_wdata = Signal.like(self.rvfi.mem_wdata)
+        # `rvfi.mode` and `rvfi.ixl` are constant, and left undriven at their initial value.
 
-        with m.If(self.x_ready):
-            m.d.sync += [
-                m_mem_addr.eq(self.x_mem_addr),
-                m_mem_wmask.eq(self.x_mem_wmask),
-                m_mem_rmask.eq(self.x_mem_rmask),
-                m_mem_wdata.eq(self.x_mem_wdata)
-            ]
-        with m.If(self.m_ready):
-            m.d.sync += [
-                self.rvfi.mem_addr.eq(m_mem_addr),
-                self.rvfi.mem_wmask.eq(m_mem_wmask),
-                self.rvfi.mem_rmask.eq(m_mem_rmask),
-                self.rvfi.mem_wdata.eq(m_mem_wdata),
-                self.rvfi.mem_rdata.eq(self.m_mem_rdata)
-            ]
+        # Program Counter
 
-        # CSRs
+        m.d.comb += self.rvfi.pc_wdata.eq(Mux(w_pc_redirect, w_pc_target, w_pc_plus4))
 
-        for res_info in self._csr_map.all_resources():
-            csr_reg, csr_name = res_info.resource, res_info.path[-1][0]
-            assert isinstance(csr_reg, csr.Register)
+        # Integer Register Write
 
-            m_csr_rdata = Signal(32, name=f"m_csr_{csr_name}_rdata")
-            w_csr_rdata = Signal(32, name=f"w_csr_{csr_name}_rdata")
+        m.d.comb += [
+            self.rvfi.rd_addr.eq(self.w_rd_addr),
+            self.rvfi.rd_wdata.eq(self.w_rd_wdata)
+        ]
 
-            with m.If(self.x_ready):
-                m.d.sync += m_csr_rdata.eq(csr_reg.x_rvfi_rdata)
-            with m.If(self.m_ready):
-                m.d.sync += w_csr_rdata.eq(m_csr_rdata)
+        # CSRs
 
+        for i, res_info in enumerate(csr_infos):
+            csr_reg, csr_name = res_info.resource, res_info.path[-1][0]
             m.d.comb += [
                 getattr(self.rvfi, f"csr_{csr_name}_rmask").eq(Const(1).replicate(32)),
-                getattr(self.rvfi, f"csr_{csr_name}_rdata").eq(w_csr_rdata),
+                getattr(self.rvfi, f"csr_{csr_name}_rdata").eq(w_csr_rdata[i]),
                 getattr(self.rvfi, f"csr_{csr_name}_wmask").eq(csr_reg.w_rvfi_wmask),
                 getattr(self.rvfi, f"csr_{csr_name}_wdata").eq(csr_reg.w_rvfi_wdata),
             ]
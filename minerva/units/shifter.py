@@ -18,23 +18,20 @@ class Shifter(wiring.Component):
     def elaborate(self, platform):
         m = Module()
 
-        x_operand = Signal(32)
-        x_filler = Signal()
+        x_sra       = Signal(signed(33))
         m_direction = Signal()
-        m_result = Signal(32)
+        m_srl_sra   = Signal(32)
+        m_sll       = Signal(32)
 
-        m.d.comb += [
-            # left shifts are equivalent to right shifts with reversed bits
-            x_operand.eq(Mux(self.x_direction, self.x_src1, self.x_src1[::-1])),
-            x_filler.eq(Mux(self.x_direction & self.x_sext, self.x_src1[-1], 0))
-        ]
+        m.d.comb += x_sra.eq(Cat(self.x_src1, self.x_src1[-1] & self.x_sext))
 
         with m.If(self.x_ready):
             m.d.sync += [
                 m_direction.eq(self.x_direction),
-                m_result.eq(Cat(x_operand, x_filler.replicate(32)) >> self.x_shamt)
+                m_srl_sra  .eq(x_sra >> self.x_shamt),
+                m_sll      .eq(self.x_src1 << self.x_shamt),
             ]
 
-        m.d.comb += self.m_result.eq(Mux(m_direction, m_result, m_result[::-1]))
+        m.d.comb += self.m_result.eq(Mux(m_direction, m_srl_sra, m_sll))
 
         return m
@@ -16,10 +16,8 @@ class L1CacheSpec(Elaboratable):
         mem_addr = Signal.like(cache.bus_addr)
         mem_data = Signal.like(cache.bus_data)
 
-        m.d.comb += [
-            mem_addr.eq(AnyConst(cache.bus_addr.shape())),
-            mem_data.eq(AnyConst(cache.bus_data.shape())),
-        ]
+        mem_const = Cat(mem_addr, mem_data)
+        m.d.comb += mem_const.eq(AnyConst(len(mem_const)))
 
         with m.If(cache.bus_req & (cache.bus_addr == mem_addr)):
             m.d.comb += Assume(cache.bus_data == mem_data)
@@ -27,12 +25,7 @@ class L1CacheSpec(Elaboratable):
         s1_op    = Signal.like(cache.s2_op)
         s1_valid = Signal()
 
-        m.d.comb  += [
-            s1_op.read .eq(AnySeq(1)),
-            s1_op.flush.eq(AnySeq(1)),
-            s1_op.evict.eq(AnySeq(1)),
-            s1_valid   .eq(AnySeq(1)),
-        ]
+        m.d.comb += Cat(s1_op.read, s1_op.flush, s1_op.evict, s1_valid).eq(AnySeq(4))
 
         with m.If(cache.s1_ready):
             m.d.sync += [
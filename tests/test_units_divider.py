@@ -1,3 +1,4 @@
+import random
 import unittest
 
 from amaranth import *
@@ -5,36 +6,74 @@ from amaranth.sim import *
 
 from minerva.units.divider import *
 from minerva.isa import Funct3
+from minerva.test.utils import run_simulation
+
+
+async def run_op(ctx, dut, funct3, src1, src2):
+    ctx.set(dut.x_op, funct3)
+    ctx.set(dut.x_src1, src1)
+    ctx.set(dut.x_src2, src2)
+    ctx.set(dut.x_valid, 1)
+    ctx.set(dut.x_ready, 1)
+    await ctx.tick()
+    ctx.set(dut.x_valid, 0)
+    await ctx.tick()
+    while ctx.get(dut.m_busy):
+        await ctx.tick()
+    return ctx.get(dut.m_result)
+
+
+# Operands of every `test_op` case. They are all run in a single simulation by `setUpClass`, and
+# each test method only checks its own result.
+_test_ops = []
 
 
 def test_op(funct3, src1, src2, result):
+    _test_ops.append((funct3, src1, src2))
+
     def test(self):
-        sim = Simulator(self.dut)
+        self.assertEqual(self.results[funct3, src1, src2], result)
 
-        async def testbench(ctx):
-            ctx.set(self.dut.x_op, funct3)
-            ctx.set(self.dut.x_src1, src1)
-            ctx.set(self.dut.x_src2, src2)
-            ctx.set(self.dut.x_valid, 1)
-            ctx.set(self.dut.x_ready, 1)
-            await ctx.tick()
-            ctx.set(self.dut.x_valid, 0)
-            await ctx.tick()
-            while ctx.get(self.dut.m_busy):
-                await ctx.tick()
-            self.assertEqual(ctx.get(self.dut.m_result), result)
+    return test
 
-        sim.add_clock(1e-6)
-        sim.add_testbench(testbench)
-        with sim.write_vcd(vcd_file="dump.vcd"):
-            sim.run()
 
-    return test
+def divide(funct3, src1, src2):
+    """Reference model of the RV32M division instructions."""
+    if funct3 in (Funct3.DIV, Funct3.REM):
+        src1 -= (src1 & 2**31) << 1
+        src2 -= (src2 & 2**31) << 1
+
+    if src2 == 0:
+        quotient, remainder = -1, src1
+    elif src1 == -2**31 and src2 == -1:
+        quotient, remainder = src1, 0
+    else:
+        quotient = abs(src1) // abs(src2)
+        if (src1 < 0) != (src2 < 0):
+            quotient = -quotient
+        remainder = src1 - src2 * quotient
+
+    if funct3 in (Funct3.REM, Funct3.REMU):
+        return remainder & 0xffffffff
+    else:
+        return quotient & 0xffffffff
 
 
 class DividerTestCase(unittest.TestCase):
-    def setUp(self):
-        self.dut = Divider()
+    @classmethod
+    def setUpClass(cls):
+        cls.dut = Divider()
+        cls.results = {}
+
+        sim = Simulator(cls.dut)
+
+        async def testbench(ctx):
+            for funct3, src1, src2 in _test_ops:
+                cls.results[funct3, src1, src2] = await run_op(ctx, cls.dut, funct3, src1, src2)
+
+        sim.add_clock(1e-6)
+        sim.add_testbench(testbench)
+        run_simulation(sim, f"{cls.__module__}.{cls.__qualname__}")
 
     # Test cases are taken from the riscv-compliance testbench:
     # https://github.com/riscv/riscv-compliance/tree/master/riscv-test-suite/rv32im
@@ -166,3 +205,23 @@ class DividerTestCase(unittest.TestCase):
     test_remu_22 = test_op(Funct3.REMU, 0x80000000, 0xffffffff, result=0x80000000)
     test_remu_23 = test_op(Funct3.REMU, 0x80000000, 0x7fffffff, result=0x00000001)
     test_remu_24 = test_op(Funct3.REMU, 0x80000000, 0x80000000, result=0x00000000)
+
+    # Random operands ------------------------------------------------------------
+
+    def test_random(self):
+        rng = random.Random(0)
+        ops = (Funct3.DIV, Funct3.DIVU, Funct3.REM, Funct3.REMU)
+        vectors = [(rng.choice(ops), rng.getrandbits(32), rng.getrandbits(32 - rng.randrange(32)))
+                   for _ in range(200)]
+
+        sim = Simulator(self.dut)
+
+        async def testbench(ctx):
+            for funct3, src1, src2 in vectors:
+                self.assertEqual(await run_op(ctx, self.dut, funct3, src1, src2),
+                                 divide(funct3, src1, src2),
+                                 msg=f"{funct3} {src1:#010x} {src2:#010x}")
+
+        sim.add_clock(1e-6)
+        sim.add_testbench(testbench)
+        run_simulation(sim, self.id())
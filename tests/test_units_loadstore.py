@@ -0,0 +1,201 @@
+import unittest
+
+from amaranth import *
+from amaranth.sim import *
+
+from amaranth_soc.wishbone import CycleType
+
+from minerva.test.utils import run_simulation
+from minerva.units.loadstore import WriteBuffer, CachedLoadStoreUnit
+
+
+class WriteBufferTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dut = WriteBuffer(depth=2, addr_width=30, data_width=32, granularity=8)
+
+    def run_testbench(self, testbench):
+        sim = Simulator(self.dut)
+        sim.add_clock(1e-6)
+        sim.add_testbench(testbench)
+        run_simulation(sim, self.id())
+
+    # While writes are outstanding, `empty` must stay low on every cycle, including when a write
+    # moves from the pending register to the FIFO.
+    async def tick(self, ctx):
+        await ctx.tick()
+        self.assertFalse(ctx.get(self.dut.empty))
+
+    async def write(self, ctx, addr, mask, data):
+        self.assertTrue(ctx.get(self.dut.w_rdy))
+        ctx.set(self.dut.w_en, 1)
+        ctx.set(self.dut.w_op.addr, addr)
+        ctx.set(self.dut.w_op.mask, mask)
+        ctx.set(self.dut.w_op.data, data)
+        await self.tick(ctx)
+        ctx.set(self.dut.w_en, 0)
+
+    async def read(self, ctx):
+        for _ in range(8):
+            if ctx.get(self.dut.r_rdy):
+                break
+            await self.tick(ctx)
+        else:
+            self.fail("Write buffer output is not ready")
+        r_op = ctx.get(self.dut.r_op)
+        ctx.set(self.dut.r_en, 1)
+        await ctx.tick()
+        ctx.set(self.dut.r_en, 0)
+        return r_op.addr, r_op.mask, r_op.data
+
+    def test_merge(self):
+        async def testbench(ctx):
+            await self.write(ctx, 0x10, 0b1111, 0xaaaaaaaa)
+            # Let the first write reach the FIFO output, so that the next ones are merged while it
+            # is being drained.
+            for _ in range(4):
+                await self.tick(ctx)
+            self.assertTrue(ctx.get(self.dut.r_rdy))
+            await self.write(ctx, 0x20, 0b0001, 0x000000bb)
+            await self.write(ctx, 0x20, 0b0010, 0x0000cc00)
+            await self.write(ctx, 0x20, 0b0001, 0x000000dd)
+            self.assertEqual(await self.read(ctx), (0x10, 0b1111, 0xaaaaaaaa))
+            self.assertFalse(ctx.get(self.dut.empty))
+            self.assertEqual(await self.read(ctx), (0x20, 0b0011, 0x0000ccdd))
+            self.assertTrue(ctx.get(self.dut.empty))
+
+        self.run_testbench(testbench)
+
+    def test_different_word(self):
+        async def testbench(ctx):
+            await self.write(ctx, 0x10, 0b0011, 0x0000aaaa)
+            await self.write(ctx, 0x11, 0b1100, 0xbbbb0000)
+            await self.write(ctx, 0x10, 0b1100, 0xcccc0000)
+            self.assertEqual(await self.read(ctx), (0x10, 0b0011, 0x0000aaaa))
+            self.assertFalse(ctx.get(self.dut.empty))
+            self.assertEqual(await self.read(ctx), (0x11, 0b1100, 0xbbbb0000))
+            self.assertFalse(ctx.get(self.dut.empty))
+            self.assertEqual(await self.read(ctx), (0x10, 0b1100, 0xcccc0000))
+            self.assertTrue(ctx.get(self.dut.empty))
+
+        self.run_testbench(testbench)
+
+    def test_full(self):
+        async def testbench(ctx):
+            # The FIFO holds two writes, and the pending register a third one.
+            await self.write(ctx, 0x10, 0b1111, 0x10101010)
+            await self.write(ctx, 0x11, 0b1111, 0x11111111)
+            await self.write(ctx, 0x12, 0b1111, 0x12121212)
+            for _ in range(4):
+                await self.tick(ctx)
+            self.assertFalse(ctx.get(self.dut.w_rdy))
+            self.assertEqual(await self.read(ctx), (0x10, 0b1111, 0x10101010))
+            for _ in range(4):
+                await self.tick(ctx)
+            self.assertTrue(ctx.get(self.dut.w_rdy))
+            await self.write(ctx, 0x13, 0b1111, 0x13131313)
+            self.assertEqual(await self.read(ctx), (0x11, 0b1111, 0x11111111))
+            self.assertEqual(await self.read(ctx), (0x12, 0b1111, 0x12121212))
+            self.assertEqual(await self.read(ctx), (0x13, 0b1111, 0x13131313))
+            self.assertTrue(ctx.get(self.dut.empty))
+
+        self.run_testbench(testbench)
+
+
+class CachedLoadStoreUnitTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dut = CachedLoadStoreUnit(dcache_nways=1, dcache_nlines=4, dcache_nwords=4,
+                                       dcache_base=0, dcache_limit=0x1000, wrbuf_depth=4)
+
+    def test_wrbuf_burst(self):
+        dut = self.dut
+
+        bus_enable = False
+        bus_log    = []
+
+        # Wishbone target which acknowledges every beat after a few wait states, and checks that
+        # the cycle tags of a beat do not change while it is waiting.
+        async def target(ctx):
+            beat = None
+            wait = 0
+            while True:
+                await ctx.tick()
+                ctx.set(dut.dbus.ack, 0)
+                if not (bus_enable and ctx.get(dut.dbus.cyc) and ctx.get(dut.dbus.stb)):
+                    beat = None
+                    continue
+                curr = (ctx.get(dut.dbus.adr), ctx.get(dut.dbus.we), ctx.get(dut.dbus.cti),
+                        ctx.get(dut.dbus.sel), ctx.get(dut.dbus.dat_w))
+                if beat is None or curr[0] != beat[0]:
+                    beat = curr
+                    wait = 0
+                    continue
+                self.assertEqual(curr, beat)
+                wait += 1
+                if wait == 3:
+                    bus_log.append(beat[:3])
+                    ctx.set(dut.dbus.dat_r, beat[0])
+                    ctx.set(dut.dbus.ack, 1)
+                    beat = None
+
+        async def store(ctx, addr, data):
+            ctx.set(dut.x_addr, addr)
+            ctx.set(dut.x_mask, 0b1111)
+            ctx.set(dut.x_store, 1)
+            ctx.set(dut.x_store_data, data)
+            ctx.set(dut.x_valid, 1)
+            while ctx.get(dut.x_busy):
+                ctx.set(dut.x_ready, 0)
+                await ctx.tick()
+            ctx.set(dut.x_ready, 1)
+            await ctx.tick()
+            ctx.set(dut.x_store, 0)
+            ctx.set(dut.x_valid, 0)
+            ctx.set(dut.x_ready, 0)
+
+        async def testbench(ctx):
+            nonlocal bus_enable
+
+            # Buffer an isolated write followed by writes to consecutive words, while the bus is
+            # stalled.
+            await store(ctx, 0x200, 0x11111111)
+            await store(ctx, 0x100, 0x22222222)
+            await store(ctx, 0x104, 0x33333333)
+            await store(ctx, 0x108, 0x44444444)
+
+            # Then miss in the data cache, which requests a refill.
+            ctx.set(dut.x_addr, 0x400)
+            ctx.set(dut.x_load, 1)
+            ctx.set(dut.x_valid, 1)
+            ctx.set(dut.x_ready, 1)
+            await ctx.tick()
+            ctx.set(dut.x_load, 0)
+            ctx.set(dut.x_valid, 0)
+            ctx.set(dut.x_ready, 0)
+            ctx.set(dut.m_load, 1)
+            ctx.set(dut.m_valid, 1)
+
+            bus_enable = True
+            for _ in range(200):
+                await ctx.tick()
+                if not ctx.get(dut.m_busy):
+                    break
+            else:
+                self.fail("Data cache refill did not complete")
+
+            # Buffered writes must reach the bus before the refill.
+            self.assertEqual(bus_log, [
+                (0x080, 1, CycleType.CLASSIC),
+                (0x040, 1, CycleType.INCR_BURST),
+                (0x041, 1, CycleType.INCR_BURST),
+                (0x042, 1, CycleType.END_OF_BURST),
+                (0x100, 0, CycleType.INCR_BURST),
+                (0x101, 0, CycleType.INCR_BURST),
+                (0x102, 0, CycleType.INCR_BURST),
+                (0x103, 0, CycleType.END_OF_BURST),
+            ])
+
+        sim = Simulator(dut)
+        sim.add_clock(1e-6)
+        sim.add_testbench(target, background=True)
+        sim.add_testbench(testbench)
+        run_simulation(sim, self.id())
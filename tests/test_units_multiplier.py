@@ -5,6 +5,7 @@ from amaranth.sim import *
 
 from minerva.units.multiplier import Multiplier
 from minerva.isa import Funct3
+from minerva.test.utils import run_simulation
 
 
 def test_op(funct3, src1, src2, result):
@@ -26,8 +27,7 @@ def test_op(funct3, src1, src2, result):
 
         sim.add_clock(1e-6)
         sim.add_testbench(testbench)
-        with sim.write_vcd(vcd_file="dump.vcd"):
-            sim.run()
+        run_simulation(sim, self.id())
 
     return test
 